@@ -4,18 +4,23 @@ Orchestrates email and push notification services
 """
 
 import uuid
+import time
+import functools
 import logging
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from concurrent.futures import ThreadPoolExecutor
 import threading
 
-from ..shared.base_service import ServiceRegistry, ServiceStatus
+from ..shared.base_service import ServiceRegistry, ServiceStatus, iso_now
 from ..email_service.email_service import EmailService
 from ..notification_service.notification_service import NotificationService
 
 logger = logging.getLogger(__name__)
 
+# Time allowed per send when waiting on a channel task; batches get this per winner
+_SEND_TIMEOUT = 30
+
 class NotificationDispatcher:
     """Central dispatcher for all notification services"""
     
@@ -102,6 +107,44 @@ class NotificationDispatcher:
             self.delivery_tracker.mark_failed(dispatch_id, str(e))
             return dispatch_id
     
+    def dispatch_winner_notifications_bulk(self, winner_data_list: List[Dict[str, Any]]) -> List[str]:
+        """Dispatch winner notifications for a batch of winners to all channels"""
+        dispatch_ids = [str(uuid.uuid4()) for _ in winner_data_list]
+        batch = list(zip(dispatch_ids, winner_data_list))
+        
+        try:
+            self.logger.info(f"Dispatching {len(batch)} winner notifications")
+            
+            self.delivery_tracker.start_tracking_batch(batch)
+            
+            # One task per channel for the whole batch rather than per winner
+            futures = []
+            
+            if self.email_service and self.email_service.status == ServiceStatus.ACTIVE:
+                future = self.thread_pool.submit(self._send_batch, self._send_email_notification, batch)
+                futures.append(('email', future))
+            
+            if self.notification_service and self.notification_service.status == ServiceStatus.ACTIVE:
+                # Every push in the batch carries the same draw timestamp
+                send_push = functools.partial(self._send_push_notification, timestamp=iso_now())
+                future = self.thread_pool.submit(self._send_batch, send_push, batch)
+                futures.append(('notification', future))
+            
+            self._track_batch_completion(dispatch_ids, futures)
+            
+        except Exception as e:
+            self.logger.error(f"Error dispatching winner notifications: {e}")
+            for dispatch_id in dispatch_ids:
+                self.delivery_tracker.mark_failed(dispatch_id, str(e))
+        
+        return dispatch_ids
+    
+    @staticmethod
+    def _send_batch(send_func, batch: List) -> bool:
+        """Run a per-dispatch channel sender over a batch"""
+        results = [send_func(dispatch_id, winner_data) for dispatch_id, winner_data in batch]
+        return all(results)
+    
     def _send_email_notification(self, dispatch_id: str, winner_data: Dict[str, Any]) -> bool:
         """Send email notification"""
         try:
@@ -113,10 +156,11 @@ class NotificationDispatcher:
             self.delivery_tracker.update_channel_status(dispatch_id, 'email', False, str(e))
             return False
     
-    def _send_push_notification(self, dispatch_id: str, winner_data: Dict[str, Any]) -> bool:
+    def _send_push_notification(self, dispatch_id: str, winner_data: Dict[str, Any],
+                                timestamp: Optional[str] = None) -> bool:
         """Send push notification"""
         try:
-            success = self.notification_service.send_winner_notification(winner_data)
+            success = self.notification_service.send_winner_notification(winner_data, timestamp)
             self.delivery_tracker.update_channel_status(dispatch_id, 'notification', success)
             return success
         except Exception as e:
@@ -126,21 +170,29 @@ class NotificationDispatcher:
     
     def _track_dispatch_completion(self, dispatch_id: str, futures: List):
         """Track completion of all dispatch tasks"""
+        self._track_batch_completion([dispatch_id], futures)
+    
+    def _track_batch_completion(self, dispatch_ids: List[str], futures: List):
+        """Track completion of the channel tasks shared by one or more dispatches"""
         def completion_callback():
             try:
+                # A channel task sends to every dispatch in the batch, so its deadline scales with it
+                timeout = _SEND_TIMEOUT * len(dispatch_ids)
+                
                 # Wait for all futures to complete
                 for channel, future in futures:
                     try:
-                        future.result(timeout=30)  # 30 second timeout
+                        future.result(timeout=timeout)
                     except Exception as e:
-                        self.logger.error(f"Future failed for {channel} in dispatch {dispatch_id}: {e}")
+                        self.logger.error(f"Future failed for {channel} in dispatch {', '.join(dispatch_ids)}: {e}")
                 
-                # Mark dispatch as completed
-                self.delivery_tracker.mark_completed(dispatch_id)
-                self.logger.info(f"Dispatch {dispatch_id} completed")
+                # Mark dispatches as completed
+                for dispatch_id in dispatch_ids:
+                    self.delivery_tracker.mark_completed(dispatch_id)
+                    self.logger.info(f"Dispatch {dispatch_id} completed")
                 
             except Exception as e:
-                self.logger.error(f"Error in completion callback for dispatch {dispatch_id}: {e}")
+                self.logger.error(f"Error in completion callback for dispatch {', '.join(dispatch_ids)}: {e}")
         
         # Submit completion tracking to thread pool
         self.thread_pool.submit(completion_callback)
@@ -255,22 +307,42 @@ class DeliveryTracker:
     
     def __init__(self):
         self.dispatches: Dict[str, Dict[str, Any]] = {}
+        # Running count of tracked dispatches per status, kept in step with self.dispatches
+        self.status_counts = {'pending': 0, 'completed': 0, 'failed': 0}
         self.lock = threading.Lock()
         self.logger = logging.getLogger(f"{__name__}.DeliveryTracker")
     
+    def _set_status(self, dispatch: Dict[str, Any], status: str):
+        """Change a dispatch's status and the counters (caller holds the lock)"""
+        self.status_counts[dispatch['status']] -= 1
+        self.status_counts[status] += 1
+        dispatch['status'] = status
+    
     def start_tracking(self, dispatch_id: str, data: Dict[str, Any]):
         """Start tracking a dispatch"""
+        self.start_tracking_batch([(dispatch_id, data)])
+    
+    def start_tracking_batch(self, batch: List):
+        """Start tracking (dispatch_id, data) pairs under one lock and one clock read"""
+        created_ts = time.time()
+        created_at = datetime.fromtimestamp(created_ts)
         with self.lock:
-            self.dispatches[dispatch_id] = {
-                'dispatch_id': dispatch_id,
-                'data': data,
-                'status': 'pending',
-                'channels': {},
-                'created_at': datetime.now(),
-                'completed_at': None,
-                'error_message': None
-            }
-        self.logger.debug(f"Started tracking dispatch {dispatch_id}")
+            for dispatch_id, data in batch:
+                previous = self.dispatches.get(dispatch_id)
+                if previous:
+                    self.status_counts[previous['status']] -= 1
+                self.status_counts['pending'] += 1
+                self.dispatches[dispatch_id] = {
+                    'dispatch_id': dispatch_id,
+                    'data': data,
+                    'status': 'pending',
+                    'channels': {},
+                    'created_at': created_at,
+                    'created_ts': created_ts,
+                    'completed_at': None,
+                    'error_message': None
+                }
+        self.logger.debug("Started tracking %s dispatch(es)", len(batch))
     
     def update_channel_status(self, dispatch_id: str, channel: str, success: bool, error_message: str = None):
         """Update status of a specific channel"""
@@ -288,7 +360,7 @@ class DeliveryTracker:
         with self.lock:
             if dispatch_id in self.dispatches:
                 dispatch = self.dispatches[dispatch_id]
-                dispatch['status'] = 'completed'
+                self._set_status(dispatch, 'completed')
                 dispatch['completed_at'] = datetime.now()
                 
                 # Determine overall success
@@ -303,9 +375,10 @@ class DeliveryTracker:
         """Mark dispatch as failed"""
         with self.lock:
             if dispatch_id in self.dispatches:
-                self.dispatches[dispatch_id]['status'] = 'failed'
-                self.dispatches[dispatch_id]['error_message'] = error_message
-                self.dispatches[dispatch_id]['completed_at'] = datetime.now()
+                dispatch = self.dispatches[dispatch_id]
+                self._set_status(dispatch, 'failed')
+                dispatch['error_message'] = error_message
+                dispatch['completed_at'] = datetime.now()
         
         self.logger.error(f"Marked dispatch {dispatch_id} as failed: {error_message}")
     
@@ -318,9 +391,9 @@ class DeliveryTracker:
         """Get delivery statistics"""
         with self.lock:
             total = len(self.dispatches)
-            completed = sum(1 for d in self.dispatches.values() if d['status'] == 'completed')
-            failed = sum(1 for d in self.dispatches.values() if d['status'] == 'failed')
-            pending = total - completed - failed
+            completed = self.status_counts['completed']
+            failed = self.status_counts['failed']
+            pending = self.status_counts['pending']
             
             return {
                 'total_dispatches': total,
@@ -332,16 +405,18 @@ class DeliveryTracker:
     
     def cleanup_old_dispatches(self, max_age_hours: int = 24):
         """Remove old dispatch records"""
-        cutoff = datetime.now().timestamp() - (max_age_hours * 3600)
+        cutoff = time.time() - (max_age_hours * 3600)
         
         with self.lock:
-            to_remove = [
-                dispatch_id for dispatch_id, dispatch in self.dispatches.items()
-                if dispatch['created_at'].timestamp() < cutoff
-            ]
+            # Dispatches are inserted in creation order, so stop at the first recent one
+            to_remove = []
+            for dispatch_id, dispatch in self.dispatches.items():
+                if dispatch['created_ts'] >= cutoff:
+                    break
+                to_remove.append(dispatch_id)
             
             for dispatch_id in to_remove:
-                del self.dispatches[dispatch_id]
+                self.status_counts[self.dispatches.pop(dispatch_id)['status']] -= 1
         
         if to_remove:
             self.logger.info(f"Cleaned up {len(to_remove)} old dispatch records")
@@ -6,9 +6,12 @@ Independent email microservice with REST API
 
 import os
 import logging
+import functools
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from datetime import datetime
+from ..shared.json_provider import install_json_provider
+from ..shared.base_service import iso_now
+from ..shared.server import run_app
 import threading
 import time
 
@@ -21,6 +24,7 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+install_json_provider(app)
 
 # Email service configuration
 EMAIL_CONFIG = {
@@ -34,6 +38,12 @@ EMAIL_CONFIG = {
     'max_emails_per_minute': int(os.getenv('MAX_EMAILS_PER_MINUTE', 60))
 }
 
+# Required JSON fields per endpoint
+SEND_EMAIL_REQUIRED_FIELDS = frozenset(('recipient', 'subject', 'body_html'))
+WINNER_REQUIRED_FIELDS = frozenset(('user_email', 'game', 'ticket_number'))
+SUBSCRIPTION_EXPIRY_REQUIRED_FIELDS = frozenset(('user_name', 'user_email', 'expiry_date', 'days_remaining', 'subscription_type'))
+DRAW_RESULTS_REQUIRED_FIELDS = frozenset(('user_name', 'user_email', 'game', 'draw_date', 'winning_numbers', 'jackpot_amount'))
+
 # Global email service instance
 email_service = None
 
@@ -64,7 +74,7 @@ def health_check():
                 'service': 'email_service',
                 'port': 8001,
                 'health': health,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
@@ -72,7 +82,7 @@ def health_check():
                 'service': 'email_service',
                 'port': 8001,
                 'error': 'Email service not initialized',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }), 503
     except Exception as e:
         return jsonify({
@@ -80,7 +90,7 @@ def health_check():
             'service': 'email_service',
             'port': 8001,
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/send-email', methods=['POST'])
@@ -101,12 +111,11 @@ def send_email():
             }), 400
         
         # Validate required fields
-        required_fields = ['recipient', 'subject', 'body_html']
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = SEND_EMAIL_REQUIRED_FIELDS - data.keys()
         if missing_fields:
             return jsonify({
                 'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
+                'message': f'Missing required fields: {", ".join(sorted(missing_fields))}'
             }), 400
         
         # Create email task
@@ -129,13 +138,13 @@ def send_email():
                 'status': 'success',
                 'message': 'Email queued for sending',
                 'task_id': email_task.id,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to queue email',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }), 500
             
     except Exception as e:
@@ -143,7 +152,7 @@ def send_email():
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/send-winner-notification', methods=['POST'])
@@ -164,12 +173,11 @@ def send_winner_notification():
             }), 400
         
         # Validate winner data
-        required_fields = ['user_email', 'game', 'ticket_number']
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = WINNER_REQUIRED_FIELDS - data.keys()
         if missing_fields:
             return jsonify({
                 'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
+                'message': f'Missing required fields: {", ".join(sorted(missing_fields))}'
             }), 400
         
         # Render template using Phase1 templates
@@ -202,13 +210,13 @@ def send_winner_notification():
             return jsonify({
                 'status': 'success',
                 'message': 'Winner notification sent',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to send winner notification',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }), 500
             
     except Exception as e:
@@ -216,7 +224,7 @@ def send_winner_notification():
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/metrics', methods=['GET'])
@@ -228,7 +236,7 @@ def get_metrics():
             return jsonify({
                 'status': 'success',
                 'metrics': metrics,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
@@ -239,25 +247,29 @@ def get_metrics():
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
+@functools.lru_cache(maxsize=1)
+def _template_info() -> dict:
+    """Template info built once; it is fixed for the life of the process"""
+    from .templates import get_template_info
+    return get_template_info()
+
 @app.route('/templates', methods=['GET'])
 def list_templates():
     """List available email templates"""
     try:
-        from .templates import get_template_info
-        template_info = get_template_info()
         return jsonify({
             'status': 'success',
-            'templates': template_info,
-            'timestamp': datetime.now().isoformat()
+            'templates': _template_info(),
+            'timestamp': iso_now()
         })
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/send-subscription-expiry', methods=['POST'])
@@ -278,12 +290,11 @@ def send_subscription_expiry():
             }), 400
         
         # Validate required fields
-        required_fields = ['user_name', 'user_email', 'expiry_date', 'days_remaining', 'subscription_type']
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = SUBSCRIPTION_EXPIRY_REQUIRED_FIELDS - data.keys()
         if missing_fields:
             return jsonify({
                 'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
+                'message': f'Missing required fields: {", ".join(sorted(missing_fields))}'
             }), 400
         
         # Render template
@@ -316,13 +327,13 @@ def send_subscription_expiry():
             return jsonify({
                 'status': 'success',
                 'message': 'Subscription expiry notification sent',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to send subscription expiry notification',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }), 500
             
     except Exception as e:
@@ -330,7 +341,7 @@ def send_subscription_expiry():
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/send-draw-results', methods=['POST'])
@@ -351,12 +362,11 @@ def send_draw_results():
             }), 400
         
         # Validate required fields
-        required_fields = ['user_name', 'user_email', 'game', 'draw_date', 'winning_numbers', 'jackpot_amount']
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = DRAW_RESULTS_REQUIRED_FIELDS - data.keys()
         if missing_fields:
             return jsonify({
                 'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
+                'message': f'Missing required fields: {", ".join(sorted(missing_fields))}'
             }), 400
         
         # Render template
@@ -389,13 +399,13 @@ def send_draw_results():
             return jsonify({
                 'status': 'success',
                 'message': 'Draw results notification sent',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to send draw results notification',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }), 500
             
     except Exception as e:
@@ -403,7 +413,7 @@ def send_draw_results():
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/config', methods=['GET'])
@@ -422,13 +432,13 @@ def get_config():
         return jsonify({
             'status': 'success',
             'config': safe_config,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         })
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 if __name__ == '__main__':
@@ -449,13 +459,8 @@ if __name__ == '__main__':
         print("🌐 Access: http://localhost:7001")
         print("=" * 50)
         
-        # Run Flask app
-        app.run(
-            host='0.0.0.0',
-            port=7001,
-            debug=False,
-            threaded=True
-        )
+        # Run under waitress when installed, otherwise Flask's threaded server
+        run_app(app, 7001)
     else:
         print("❌ Failed to start email service")
         exit(1)
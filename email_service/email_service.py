@@ -13,6 +13,7 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List
 import time
 import threading
+from collections import deque
 
 from ..shared.base_service import BaseNotificationService, NotificationTask, DeliveryStatus
 from ..shared.queue_manager import QueueManager, QueueTask, QueuePriority
@@ -170,7 +171,8 @@ class EmailService(BaseNotificationService):
         
         # Rate limiting
         self.max_emails_per_minute = config.get('max_emails_per_minute', 60)
-        self.email_timestamps = []
+        # Send times inside the current window, oldest first; never longer than the limit
+        self.email_timestamps = deque(maxlen=self.max_emails_per_minute)
         self.rate_limit_lock = threading.Lock()
         
         # Queue management
@@ -181,6 +183,11 @@ class EmailService(BaseNotificationService):
         # Template manager
         self.template_manager = EmailTemplateManager()
         
+        # Health check SMTP probe cache: (checked_at, healthy)
+        self.health_check_ttl = config.get('health_check_ttl', 30)
+        self._smtp_health_cache = (0.0, None)
+        self._smtp_health_lock = threading.Lock()
+        
     def initialize(self) -> bool:
         """Initialize the email service"""
         try:
@@ -287,7 +294,8 @@ class EmailService(BaseNotificationService):
         with self.rate_limit_lock:
             now = time.time()
             # Remove timestamps older than 1 minute
-            self.email_timestamps = [ts for ts in self.email_timestamps if now - ts < 60]
+            while self.email_timestamps and now - self.email_timestamps[0] >= 60:
+                self.email_timestamps.popleft()
             
             if len(self.email_timestamps) >= self.max_emails_per_minute:
                 return False
@@ -364,7 +372,7 @@ class EmailService(BaseNotificationService):
         """Check email service health"""
         try:
             # Test SMTP connection
-            smtp_healthy = self._test_smtp_connection()
+            smtp_healthy = self._cached_smtp_health()
             
             # Get queue stats
             queue_stats = self.email_queue.get_stats() if self.email_queue else {}
@@ -386,6 +394,21 @@ class EmailService(BaseNotificationService):
                 'error': str(e)
             }
     
+    def _cached_smtp_health(self) -> bool:
+        """SMTP connection test, reused for health_check_ttl seconds"""
+        checked_at, healthy = self._smtp_health_cache
+        if healthy is not None and time.monotonic() - checked_at <= self.health_check_ttl:
+            return healthy
+        
+        # One probe refreshes the cache; concurrent health checks wait for its result
+        with self._smtp_health_lock:
+            checked_at, healthy = self._smtp_health_cache
+            now = time.monotonic()
+            if healthy is None or now - checked_at > self.health_check_ttl:
+                healthy = self._test_smtp_connection()
+                self._smtp_health_cache = (time.monotonic(), healthy)
+            return healthy
+    
     def stop(self) -> bool:
         """Stop the email service"""
         try:
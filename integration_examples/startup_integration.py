@@ -3,72 +3,136 @@ Startup Integration Script for Phase1
 Shows how to initialize Utils_services notification system during Phase1 startup
 """
 
+from __future__ import annotations
+
+import functools
 import logging
 import os
 import sys
-from typing import Dict, Any, Optional
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Emoji log prefixes; set UTILS_SERVICES_LOG_EMOJI=0 for plain-text log handlers
+_EMOJI = os.environ.get('UTILS_SERVICES_LOG_EMOJI', '1') == '1'
+_START = '🚀 ' if _EMOJI else ''
+_NOTE = '📝 ' if _EMOJI else ''
+_OK = '✅ ' if _EMOJI else ''
+_WARN = '⚠️ ' if _EMOJI else ''
+_ERR = '❌ ' if _EMOJI else ''
+_CLEAN = '🧹 ' if _EMOJI else ''
+
+# Accepted values for boolean environment flags and integration methods
+_TRUTHY = frozenset({'true', '1', 'yes', 'on'})
+_VALID_METHODS = frozenset({'patch', 'adapter', 'hybrid'})
+
+# How long a status snapshot is served without re-probing, once integration is enabled
+_STATUS_CACHE_TTL = 5.0
+
+# Cached result of importing Phase1's config module (False once it is known to be missing)
+_cached_config_module = [None]
+
+def _get_phase1_config():
+    """Return Phase1's Flask app config, or None if config or its app is unavailable"""
+    cfg = sys.modules.get('config')
+    if cfg is None:
+        cfg = _cached_config_module[0]
+        if cfg is None:
+            try:
+                import config as cfg
+            except ImportError:
+                cfg = False
+            _cached_config_module[0] = cfg
+    if not cfg:
+        return None
+    return getattr(getattr(cfg, 'app', None), 'config', None)
+
+@functools.lru_cache(maxsize=1)
+def _adapter_module():
+    """Import the winner_to_user adapter module once and reuse it"""
+    from . import winner_to_user_adapter
+    return winner_to_user_adapter
+
 class Phase1StartupIntegration:
     """
     Handles initialization of Utils_services during Phase1 startup
     """
     
     def __init__(self):
+        self._status_version = 0
+        self._status_cache = None
+        self._status_cache_ts = 0.0
+        self._status_cache_version = -1
+        
         self.integration_enabled = False
         self.initialization_error = None
         
+        # Integration method -> initializer
+        self._dispatch = {
+            'patch': self._apply_monkey_patch,
+            'adapter': self._initialize_adapter,
+            'hybrid': self._initialize_hybrid_mode
+        }
+    
+    @property
+    def integration_enabled(self) -> bool:
+        return self._integration_enabled
+    
+    @integration_enabled.setter
+    def integration_enabled(self, value: bool):
+        self._integration_enabled = value
+        # Invalidate any cached status snapshot
+        self._status_version += 1
+        
     def initialize_utils_services(self) -> bool:
         """
         Initialize Utils_services during Phase1 startup
         This should be called early in Phase1's initialization process
         """
         try:
-            logger.info("🚀 Initializing Utils_services integration...")
+            logger.info("%sInitializing Utils_services integration...", _START)
             
             # Check if integration should be enabled
             if not self._should_enable_integration():
-                logger.info("📝 Utils_services integration disabled by configuration")
+                logger.info("%sUtils_services integration disabled by configuration", _NOTE)
                 return False
             
             # Verify Utils_services availability
             if not self._verify_utils_services_available():
-                logger.warning("⚠️ Utils_services not available, continuing with Phase1 original system")
+                logger.warning("%sUtils_services not available, continuing with Phase1 original system", _WARN)
                 return False
             
             # Apply integration based on configuration
             integration_method = self._get_integration_method()
             
-            if integration_method == "patch":
-                return self._apply_monkey_patch()
-            elif integration_method == "adapter":
-                return self._initialize_adapter()
-            elif integration_method == "hybrid":
-                return self._initialize_hybrid_mode()
-            else:
+            handler = self._dispatch.get(integration_method)
+            if handler is None:
                 logger.warning(f"Unknown integration method: {integration_method}")
                 return False
+            
+            return handler()
                 
         except Exception as e:
             self.initialization_error = str(e)
-            logger.error(f"❌ Failed to initialize Utils_services integration: {e}")
+            self._status_version += 1
+            logger.error("%sFailed to initialize Utils_services integration: %s", _ERR, e)
             return False
     
     def _should_enable_integration(self) -> bool:
         """Check if Utils_services integration should be enabled"""
         try:
             # Check environment variable
-            env_enabled = os.getenv('ENABLE_UTILS_SERVICES', 'false').lower()
-            if env_enabled in ['true', '1', 'yes', 'on']:
+            if os.environ.get('ENABLE_UTILS_SERVICES', '').lower() in _TRUTHY:
                 return True
             
             # Check Phase1 configuration
-            try:
-                from config import app
-                return app.config.get('ENABLE_UTILS_SERVICES', False)
-            except:
-                pass
+            app_config = _get_phase1_config()
+            if app_config is not None:
+                return app_config.get('ENABLE_UTILS_SERVICES', False)
             
             # Default: disabled for safety
             return False
@@ -90,7 +154,7 @@ class Phase1StartupIntegration:
             from email_service.email_service import EmailService
             from notification_service.notification_service import NotificationService
             
-            logger.info("✅ Utils_services components successfully imported")
+            logger.info("%sUtils_services components successfully imported", _OK)
             return True
             
         except ImportError as e:
@@ -107,15 +171,12 @@ class Phase1StartupIntegration:
             method = os.getenv('UTILS_SERVICES_INTEGRATION_METHOD', 'adapter').lower()
             
             # Check Phase1 configuration
-            try:
-                from config import app
-                method = app.config.get('UTILS_SERVICES_INTEGRATION_METHOD', method)
-            except:
-                pass
+            app_config = _get_phase1_config()
+            if app_config is not None:
+                method = app_config.get('UTILS_SERVICES_INTEGRATION_METHOD', method)
             
             # Validate method
-            valid_methods = ['patch', 'adapter', 'hybrid']
-            if method not in valid_methods:
+            if method not in _VALID_METHODS:
                 logger.warning(f"Invalid integration method '{method}', using 'adapter'")
                 return 'adapter'
             
@@ -128,36 +189,32 @@ class Phase1StartupIntegration:
     def _apply_monkey_patch(self) -> bool:
         """Apply monkey patch integration"""
         try:
-            from .winner_to_user_adapter import patch_phase1_winner_notifications
-            
-            if patch_phase1_winner_notifications():
+            if _adapter_module().patch_phase1_winner_notifications():
                 self.integration_enabled = True
-                logger.info("✅ Monkey patch integration applied successfully")
+                logger.info("%sMonkey patch integration applied successfully", _OK)
                 return True
             else:
-                logger.error("❌ Monkey patch integration failed")
+                logger.error("%sMonkey patch integration failed", _ERR)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Monkey patch integration error: {e}")
+            logger.error("%sMonkey patch integration error: %s", _ERR, e)
             return False
     
     def _initialize_adapter(self) -> bool:
         """Initialize adapter-based integration"""
         try:
-            from .winner_to_user_adapter import _winner_adapter
-            
             # Pre-initialize the adapter
-            if _winner_adapter._lazy_init_utils_services():
+            if _adapter_module()._winner_adapter._lazy_init_utils_services():
                 self.integration_enabled = True
-                logger.info("✅ Adapter integration initialized successfully")
+                logger.info("%sAdapter integration initialized successfully", _OK)
                 return True
             else:
-                logger.warning("⚠️ Adapter initialization failed, will use fallback")
+                logger.warning("%sAdapter initialization failed, will use fallback", _WARN)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Adapter integration error: {e}")
+            logger.error("%sAdapter integration error: %s", _ERR, e)
             return False
     
     def _initialize_hybrid_mode(self) -> bool:
@@ -173,18 +230,28 @@ class Phase1StartupIntegration:
             
             if adapter_success or patch_success:
                 self.integration_enabled = True
-                logger.info(f"✅ Hybrid integration - Adapter: {adapter_success}, Patch: {patch_success}")
+                logger.info("%sHybrid integration - Adapter: %s, Patch: %s", _OK, adapter_success, patch_success)
                 return True
             else:
-                logger.error("❌ Both adapter and patch initialization failed")
+                logger.error("%sBoth adapter and patch initialization failed", _ERR)
                 return False
                 
         except Exception as e:
-            logger.error(f"❌ Hybrid integration error: {e}")
+            logger.error("%sHybrid integration error: %s", _ERR, e)
             return False
     
     def get_integration_status(self) -> Dict[str, Any]:
-        """Get the current integration status"""
+        """
+        Get the current integration status
+        Once integration is enabled, a snapshot is reused for a few seconds
+        so frequent health checks don't re-probe imports on every call
+        """
+        if (self.integration_enabled
+                and self._status_cache is not None
+                and self._status_cache_version == self._status_version
+                and time.monotonic() - self._status_cache_ts < _STATUS_CACHE_TTL):
+            return dict(self._status_cache)
+        
         status = {
             'enabled': self.integration_enabled,
             'initialization_error': self.initialization_error,
@@ -194,63 +261,67 @@ class Phase1StartupIntegration:
         }
         
         # Get adapter stats if available
+        status['adapter_stats'] = None
         try:
-            from .winner_to_user_adapter import get_adapter_stats
-            status['adapter_stats'] = get_adapter_stats()
-        except:
-            status['adapter_stats'] = None
+            status['adapter_stats'] = _adapter_module().get_adapter_stats()
+        except ImportError as e:
+            logger.debug("Adapter stats unavailable: %s", e)
         
-        return status
+        if self.integration_enabled:
+            self._status_cache = status
+            self._status_cache_ts = time.monotonic()
+            self._status_cache_version = self._status_version
+        
+        return dict(status)
     
     def cleanup_integration(self):
         """Clean up integration during shutdown"""
         try:
             if self.integration_enabled:
-                logger.info("🧹 Cleaning up Utils_services integration...")
+                logger.info("%sCleaning up Utils_services integration...", _CLEAN)
                 
                 # Unpatch if patch was applied
                 try:
-                    from .winner_to_user_adapter import unpatch_phase1_winner_notifications
-                    unpatch_phase1_winner_notifications()
-                except:
+                    _adapter_module().unpatch_phase1_winner_notifications()
+                except ImportError:
                     pass
                 
                 self.integration_enabled = False
-                logger.info("✅ Utils_services integration cleanup completed")
+                logger.info("%sUtils_services integration cleanup completed", _OK)
                 
         except Exception as e:
-            logger.error(f"❌ Error during integration cleanup: {e}")
+            logger.error("%sError during integration cleanup: %s", _ERR, e)
+
+# Global integration manager (created on first use)
+_startup_integration = None
 
-# Global integration manager
-_startup_integration = Phase1StartupIntegration()
+def _get_singleton() -> Phase1StartupIntegration:
+    """Get the shared integration manager, creating it on first use"""
+    global _startup_integration
+    if _startup_integration is None:
+        _startup_integration = Phase1StartupIntegration()
+    return _startup_integration
 
 def initialize_utils_services_integration() -> bool:
     """
     Initialize Utils_services integration
     Call this function during Phase1 startup
     """
-    return _startup_integration.initialize_utils_services()
+    return _get_singleton().initialize_utils_services()
 
 def get_integration_status() -> Dict[str, Any]:
     """Get current integration status"""
-    return _startup_integration.get_integration_status()
+    return _get_singleton().get_integration_status()
 
 def cleanup_utils_services_integration():
     """
     Clean up Utils_services integration
     Call this function during Phase1 shutdown
     """
-    _startup_integration.cleanup_integration()
+    _get_singleton().cleanup_integration()
 
-def phase1_main_integration_example():
-    """
-    Example of how to integrate Utils_services into Phase1's main.py
-    """
-    print("\n📋 Phase1 main.py Integration Example")
-    print("-" * 50)
-    
-    # This is how you would modify Phase1's main.py
-    example_main_code = '''
+# Example snippets printed by the helpers below
+_EXAMPLE_MAIN_CODE = '''
 # Add this to Phase1/src/main.py
 
 # At the top of the file, add:
@@ -316,9 +387,28 @@ def utils_services_health():
     else:
         return jsonify({'available': False})
 '''
+
+_CONFIG_EXAMPLE = '''
+# Add to Phase1 configuration
+ENABLE_UTILS_SERVICES = True
+UTILS_SERVICES_INTEGRATION_METHOD = 'adapter'  # 'patch', 'adapter', or 'hybrid'
+
+# Optional: Utils_services specific settings
+UTILS_SERVICES_EMAIL_MAX_PER_MINUTE = 60
+UTILS_SERVICES_NOTIFICATION_MAX_PER_HOUR = 100
+UTILS_SERVICES_FALLBACK_ENABLED = True
+'''
+
+def phase1_main_integration_example():
+    """
+    Example of how to integrate Utils_services into Phase1's main.py
+    """
+    print("\n📋 Phase1 main.py Integration Example")
+    print("-" * 50)
     
+    # This is how you would modify Phase1's main.py
     print("Code to add to Phase1/src/main.py:")
-    print(example_main_code)
+    print(_EXAMPLE_MAIN_CODE)
 
 def configuration_examples():
     """Show configuration examples"""
@@ -330,17 +420,7 @@ def configuration_examples():
     print("export UTILS_SERVICES_INTEGRATION_METHOD=adapter  # or 'patch' or 'hybrid'")
     
     print("\nPhase1 Config (config.py):")
-    config_example = '''
-# Add to Phase1 configuration
-ENABLE_UTILS_SERVICES = True
-UTILS_SERVICES_INTEGRATION_METHOD = 'adapter'  # 'patch', 'adapter', or 'hybrid'
-
-# Optional: Utils_services specific settings
-UTILS_SERVICES_EMAIL_MAX_PER_MINUTE = 60
-UTILS_SERVICES_NOTIFICATION_MAX_PER_HOUR = 100
-UTILS_SERVICES_FALLBACK_ENABLED = True
-'''
-    print(config_example)
+    print(_CONFIG_EXAMPLE)
 
 if __name__ == "__main__":
     print("🚀 Phase1 Startup Integration Examples")
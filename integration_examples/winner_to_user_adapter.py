@@ -3,12 +3,41 @@ Direct Adapter for Phase1's winner_to_user.py
 Provides seamless integration with existing Phase1 winner notification system
 """
 
+import functools
 import logging
 import threading
+import time
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# User email/name rarely change, so repeat winners are served from memory
+_USER_CACHE_TTL = 3600
+_USER_CACHE_MAXSIZE = 10000
+# Upper bound on ids per IN (...) lookup so large draws don't build one huge statement
+_USER_LOOKUP_BATCH = 1000
+
+# Phase1 user lookups
+_SELECT_USER_EMAIL = "SELECT email FROM users WHERE id = %s"
+_SELECT_USER_NAME = "SELECT first_name, last_name FROM users WHERE id = %s"
+_SELECT_USERS_IN = "SELECT id, email, first_name, last_name FROM users WHERE id IN ({placeholders})"
+
+# SMTP settings used while Phase1's config can't be read; never cached
+_DEFAULT_EMAIL_CONFIG = {'smtp_server': 'smtp.gmail.com', 'smtp_port': 587, 'use_tls': True}
+
+def _user_key(user_id: Any) -> Optional[int]:
+    """Normalize a winner's user_id (int, or digits from JSON) to the int the users table uses"""
+    if isinstance(user_id, int) and not isinstance(user_id, bool):
+        return user_id
+    if isinstance(user_id, str) and user_id.isascii() and user_id.isdigit():
+        return int(user_id)
+    return None
+
+@functools.lru_cache(maxsize=32)
+def _select_users_in(count: int) -> str:
+    """Bulk user lookup statement for count ids, built once per size"""
+    return _SELECT_USERS_IN.format(placeholders=', '.join(['%s'] * count))
+
 class WinnerToUserAdapter:
     """
     Adapter that integrates directly with Phase1's winner_to_user.py
@@ -16,9 +45,20 @@ class WinnerToUserAdapter:
     """
     
     def __init__(self):
-        self.utils_services_available = False
         self.dispatcher = None
         self._init_lock = threading.Lock()
+        # Set only once the dispatcher is fully initialized
+        self._init_done = threading.Event()
+        # True while the last initialization attempt failed; reported in get_stats
+        self._init_failed = False
+        
+        # Phase1 configuration, read once and reused until invalidated
+        self._email_config = None
+        self._notification_config = None
+        
+        # user_id -> (expires_at, (email, name))
+        self._user_cache: Dict[int, tuple] = {}
+        self._user_cache_lock = threading.Lock()
         
         # Statistics
         self.stats = {
@@ -28,14 +68,29 @@ class WinnerToUserAdapter:
             'errors': 0
         }
     
+    @property
+    def utils_services_available(self) -> bool:
+        """Whether the Utils_services dispatcher finished initializing"""
+        return self._init_done.is_set()
+    
+    @utils_services_available.setter
+    def utils_services_available(self, value: bool):
+        if value:
+            self._init_done.set()
+        else:
+            self._init_done.clear()
+    
     def _lazy_init_utils_services(self):
         """Lazy initialization of Utils_services to avoid startup dependencies"""
-        if self.utils_services_available or self.dispatcher:
+        if self._init_done.is_set():
             return True
         
+        # Read Phase1 configurations before taking the lock so waiting threads don't queue behind it
+        email_config = self._get_phase1_email_config()
+        notification_config = self._get_phase1_notification_config()
+        
         with self._init_lock:
-            # Double-check pattern
-            if self.utils_services_available:
+            if self._init_done.is_set():
                 return True
             
             try:
@@ -48,27 +103,48 @@ class WinnerToUserAdapter:
                 
                 from dispatcher.notification_dispatcher import NotificationDispatcher
                 
-                # Get Phase1 configurations
-                email_config = self._get_phase1_email_config()
-                notification_config = self._get_phase1_notification_config()
+                # Initialize dispatcher; publish it only once it is ready
+                dispatcher = NotificationDispatcher()
                 
-                # Initialize dispatcher
-                self.dispatcher = NotificationDispatcher()
-                
-                if self.dispatcher.initialize(email_config, notification_config):
-                    self.utils_services_available = True
+                if dispatcher.initialize(email_config, notification_config):
+                    self.dispatcher = dispatcher
+                    self._init_failed = False
+                    self._init_done.set()
                     logger.info("Utils_services notification system initialized")
                     return True
                 else:
+                    self._init_failed = True
                     logger.warning("Failed to initialize Utils_services")
                     return False
                     
             except Exception as e:
+                self._init_failed = True
                 logger.debug(f"Utils_services not available: {e}")
                 return False
     
     def _get_phase1_email_config(self) -> Dict[str, Any]:
-        """Get email configuration from Phase1"""
+        """Get email configuration from Phase1 (cached once Phase1's config was read)"""
+        if self._email_config is None:
+            email_config = self._load_phase1_email_config()
+            if email_config is None:
+                # Retry Phase1 on the next call instead of pinning the defaults
+                return dict(_DEFAULT_EMAIL_CONFIG)
+            self._email_config = email_config
+        return self._email_config
+    
+    def _get_phase1_notification_config(self) -> Dict[str, Any]:
+        """Get notification configuration from Phase1 (cached)"""
+        if self._notification_config is None:
+            self._notification_config = self._load_phase1_notification_config()
+        return self._notification_config
+    
+    def invalidate_config_cache(self):
+        """Drop cached Phase1 configuration, e.g. after Phase1 reloads its config"""
+        self._email_config = None
+        self._notification_config = None
+    
+    def _load_phase1_email_config(self) -> Optional[Dict[str, Any]]:
+        """Read email configuration from Phase1, or None if it can't be read"""
         try:
             from config import app
             return {
@@ -81,11 +157,12 @@ class WinnerToUserAdapter:
                 'sender_name': 'Lotto Command Center',
                 'max_emails_per_minute': 60
             }
-        except:
-            return {'smtp_server': 'smtp.gmail.com', 'smtp_port': 587, 'use_tls': True}
+        except Exception as e:
+            logger.debug(f"Phase1 email config not available: {e}")
+            return None
     
-    def _get_phase1_notification_config(self) -> Dict[str, Any]:
-        """Get notification configuration from Phase1"""
+    def _load_phase1_notification_config(self) -> Dict[str, Any]:
+        """Read notification configuration from Phase1"""
         return {
             'store_in_database': True,
             'send_via_websocket': True,
@@ -119,19 +196,42 @@ class WinnerToUserAdapter:
             winners = json_data.get("winners", {})
             dispatch_ids = []
             
-            for game, game_winners in winners.items():
-                for winner in game_winners:
-                    # Prepare winner data for Utils_services
-                    winner_data = self._prepare_winner_data(winner, game)
-                    
-                    # Dispatch notification
-                    dispatch_id = self.dispatcher.dispatch_winner_notification(winner_data)
-                    
-                    if dispatch_id:
-                        dispatch_ids.append(dispatch_id)
-                        
-                        # Also call the original database record insertion
-                        self._insert_winning_details(winner)
+            # Look up every winner's user record in one query up front
+            user_ids = {
+                _user_key(winner.get('user_id'))
+                for game_winners in winners.values()
+                for winner in game_winners
+            }
+            user_ids.discard(None)
+            users, missing_ids = self._get_cached_users(user_ids)
+            if missing_ids:
+                fetched = self._bulk_fetch_users(missing_ids)
+                if fetched is not None:
+                    self._cache_users(fetched)
+                else:
+                    fetched = self._fetch_users_individually(missing_ids)
+                users.update(fetched)
+            
+            # Prepare winner data for Utils_services
+            batch = [
+                (winner, self._prepare_winner_data(winner, game, users))
+                for game, game_winners in winners.items()
+                for winner in game_winners
+            ]
+            
+            # Dispatch the whole batch in one call
+            batch_ids = self.dispatcher.dispatch_winner_notifications_bulk(
+                [winner_data for _, winner_data in batch]
+            )
+            
+            dispatched_winners = []
+            for (winner, _), dispatch_id in zip(batch, batch_ids):
+                if dispatch_id:
+                    dispatch_ids.append(dispatch_id)
+                    dispatched_winners.append(winner)
+            
+            # Also call the original database record insertion
+            self._bulk_insert_winning_details(dispatched_winners)
             
             if dispatch_ids:
                 self.stats['utils_services_success'] += 1
@@ -150,17 +250,26 @@ class WinnerToUserAdapter:
             logger.warning(f"Utils_services processing failed: {e}")
             return self._fallback_to_original(json_data)
     
-    def _prepare_winner_data(self, winner: Dict[str, Any], game: str) -> Dict[str, Any]:
-        """Prepare winner data for Utils_services format"""
-        
-        # Get user email
-        user_email = self._get_user_email(winner.get('user_id'))
+    def _prepare_winner_data(self,
+                             winner: Dict[str, Any],
+                             game: str,
+                             users: Dict[int, tuple]) -> Dict[str, Any]:
+        """
+        Prepare winner data for Utils_services format
+        users maps user_id to (email, name); users missing from it get placeholders
+        """
+        user_id = winner.get('user_id')
         
-        # Get user name
-        user_name = self._get_user_name(winner.get('user_id'))
+        user = users.get(_user_key(user_id))
+        if user:
+            user_email, user_name = user
+        else:
+            user_email = f"user_{user_id}@unknown.com"
+            user_name = f"User {user_id}"
         
+        matches = winner.get('matches')
         return {
-            'user_id': winner.get('user_id'),
+            'user_id': user_id,
             'user_email': user_email,
             'name': user_name,
             'game': game.upper(),
@@ -168,54 +277,152 @@ class WinnerToUserAdapter:
             'ticket_numbers': winner.get('ticket_numbers'),
             'draw_date': winner.get('draw_date'),
             'ticket_id': winner.get('id'),
-            'classic_draw': winner.get('matches', [{}])[0] if winner.get('matches') else {},
+            'classic_draw': matches[0] if matches else {},
             'gold_ball_draw': winner.get('gold_ball_draw'),
             'extra_match': winner.get('extra_match'),
             'max_million': winner.get('max_million_match'),
             'frontend_url': 'https://www.thesantris.com'  # From Phase1 config
         }
     
-    def _get_user_email(self, user_id: int) -> str:
-        """Get user email from Phase1 database"""
+    def _bulk_fetch_users(self, user_ids) -> Optional[Dict[int, tuple]]:
+        """
+        Get email and name for many users from Phase1 database in one query
+        Returns {user_id: (email, name)}, or None if the lookup failed
+        """
+        ids = [user_id for user_id in user_ids if user_id is not None]
+        if not ids:
+            return {}
+        
         try:
             from config import get_connection
             
+            users = {}
             with get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT email FROM users WHERE id = %s", (user_id,))
-                result = cursor.fetchone()
-                return result[0] if result else f"user_{user_id}@unknown.com"
+                for start in range(0, len(ids), _USER_LOOKUP_BATCH):
+                    batch = ids[start:start + _USER_LOOKUP_BATCH]
+                    cursor.execute(_select_users_in(len(batch)), tuple(batch))
+                    for row in cursor.fetchall():
+                        users[int(row[0])] = (row[1], self._format_user_name(row[2], row[3]))
+            return users
                 
         except Exception as e:
-            logger.warning(f"Could not get user email for {user_id}: {e}")
-            return f"user_{user_id}@unknown.com"
+            logger.warning(f"Could not bulk fetch users {ids}: {e}")
+            return None
+    
+    def _get_cached_users(self, user_ids) -> tuple:
+        """Split user_ids into cached (email, name) entries and ids still to fetch"""
+        now = time.monotonic()
+        cached = {}
+        missing = []
+        with self._user_cache_lock:
+            for user_id in user_ids:
+                entry = self._user_cache.get(user_id)
+                if entry and entry[0] > now:
+                    cached[user_id] = entry[1]
+                else:
+                    missing.append(user_id)
+        return cached, missing
+    
+    def _cache_users(self, users: Dict[int, tuple]):
+        """Remember fetched users, evicting the oldest entries past the size cap"""
+        expires_at = time.monotonic() + _USER_CACHE_TTL
+        with self._user_cache_lock:
+            for user_id, user in users.items():
+                self._user_cache.pop(user_id, None)
+                self._user_cache[user_id] = (expires_at, user)
+            while len(self._user_cache) > _USER_CACHE_MAXSIZE:
+                del self._user_cache[next(iter(self._user_cache))]
     
-    def _get_user_name(self, user_id: int) -> str:
-        """Get user name from Phase1 database"""
+    def clear_user_cache(self):
+        """Drop cached user emails/names"""
+        with self._user_cache_lock:
+            self._user_cache.clear()
+    
+    def invalidate_users(self, user_ids):
+        """Drop cached email/name for just the given users, e.g. after a profile update"""
+        with self._user_cache_lock:
+            for user_id in user_ids:
+                self._user_cache.pop(_user_key(user_id), None)
+    
+    def _fetch_users_individually(self, user_ids) -> Dict[int, tuple]:
+        """
+        Per-user lookups for when the bulk query fails, sharing one connection
+        Returns {} if no connection can be had, so every user gets a placeholder
+        """
+        ids = [user_id for user_id in user_ids if user_id is not None]
+        
         try:
             from config import get_connection
             
             with get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT first_name, last_name FROM users WHERE id = %s", (user_id,))
-                result = cursor.fetchone()
-                if result:
-                    first_name = result[0] or ""
-                    last_name = result[1] or ""
-                    return f"{first_name} {last_name}".strip()
-                return f"User {user_id}"
+                return {
+                    user_id: (self._get_user_email(user_id, cursor), self._get_user_name(user_id, cursor))
+                    for user_id in ids
+                }
                 
+        except Exception as e:
+            logger.warning(f"Could not get a connection for user lookups: {e}")
+            return {}
+    
+    @staticmethod
+    def _format_user_name(first_name: Optional[str], last_name: Optional[str]) -> str:
+        """Join first and last name the way Phase1 displays them"""
+        return f"{first_name or ''} {last_name or ''}".strip()
+    
+    def _get_user_email(self, user_id: int, cursor=None) -> str:
+        """Get user email from Phase1 database, on the caller's cursor if given"""
+        try:
+            if cursor is None:
+                from config import get_connection
+                
+                with get_connection() as conn:
+                    return self._get_user_email(user_id, conn.cursor())
+            
+            cursor.execute(_SELECT_USER_EMAIL, (user_id,))
+            result = cursor.fetchone()
+            return result[0] if result else f"user_{user_id}@unknown.com"
+            
+        except Exception as e:
+            logger.warning(f"Could not get user email for {user_id}: {e}")
+            return f"user_{user_id}@unknown.com"
+    
+    def _get_user_name(self, user_id: int, cursor=None) -> str:
+        """Get user name from Phase1 database, on the caller's cursor if given"""
+        try:
+            if cursor is None:
+                from config import get_connection
+                
+                with get_connection() as conn:
+                    return self._get_user_name(user_id, conn.cursor())
+            
+            cursor.execute(_SELECT_USER_NAME, (user_id,))
+            result = cursor.fetchone()
+            if result:
+                return self._format_user_name(result[0], result[1])
+            return f"User {user_id}"
+            
         except Exception as e:
             logger.warning(f"Could not get user name for {user_id}: {e}")
             return f"User {user_id}"
     
-    def _insert_winning_details(self, winner: Dict[str, Any]):
-        """Insert winning details using original Phase1 function"""
+    def _bulk_insert_winning_details(self, winners):
+        """Insert winning details for a batch using original Phase1 function"""
+        if not winners:
+            return
+        
         try:
             from models.ticket.winner_record import insert_winning_details
-            insert_winning_details(winner)
         except Exception as e:
             logger.warning(f"Could not insert winning details: {e}")
+            return
+        
+        for winner in winners:
+            try:
+                insert_winning_details(winner)
+            except Exception as e:
+                logger.warning(f"Could not insert winning details: {e}")
     
     def _fallback_to_original(self, json_data: Dict[str, Any]):
         """Fallback to original Phase1 implementation"""
@@ -249,6 +456,7 @@ class WinnerToUserAdapter:
         total = self.stats['total_calls']
         return {
             'utils_services_available': self.utils_services_available,
+            'utils_services_init_failed': self._init_failed,
             **self.stats,
             'utils_services_success_rate': (self.stats['utils_services_success'] / total * 100) if total > 0 else 0,
             'fallback_rate': (self.stats['fallback_used'] / total * 100) if total > 0 else 0,
@@ -269,6 +477,10 @@ def get_adapter_stats() -> Dict[str, Any]:
     """Get statistics about the adapter usage"""
     return _winner_adapter.get_stats()
 
+def invalidate_user_cache(user_ids):
+    """Forget cached email/name for users whose Phase1 profile changed"""
+    _winner_adapter.invalidate_users(user_ids)
+
 # Patch function for easy integration
 def patch_phase1_winner_notifications():
     """
@@ -5,12 +5,16 @@ Independent notification microservice with REST API
 """
 
 import os
+import sys
+import hashlib
 import logging
 from flask import Flask, request, jsonify
-from flask_cors import CORS
-from datetime import datetime
+from ..shared.json_provider import install_json_provider
+from ..shared.base_service import iso_now
+from ..shared.server import run_app
 import threading
 import time
+from typing import Any, Optional
 
 # Configure logging
 logging.basicConfig(
@@ -20,19 +24,66 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-CORS(app)
+install_json_provider(app)
+
+# CORS allow-list, e.g. ALLOWED_ORIGINS=https://a.example,https://b.example ('*' allows any origin)
+ALLOWED_ORIGINS = frozenset(
+    origin.strip() for origin in os.getenv('ALLOWED_ORIGINS', '*').split(',') if origin.strip()
+)
+ALLOW_ANY_ORIGIN = '*' in ALLOWED_ORIGINS
+CORS_ALLOW_METHODS = 'GET, POST, PUT, DELETE, OPTIONS'
+
+@app.after_request
+def add_cors_headers(response):
+    """Set CORS headers for allowed origins"""
+    origin = request.headers.get('Origin')
+    if not origin:
+        return response
+    
+    if ALLOW_ANY_ORIGIN:
+        response.headers['Access-Control-Allow-Origin'] = '*'
+    elif origin in ALLOWED_ORIGINS:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.vary.add('Origin')
+    else:
+        return response
+    
+    # Preflight requests are answered by Flask's automatic OPTIONS handling
+    if request.method == 'OPTIONS':
+        response.headers['Access-Control-Allow-Methods'] = CORS_ALLOW_METHODS
+        requested_headers = request.headers.get('Access-Control-Request-Headers')
+        if requested_headers:
+            response.headers['Access-Control-Allow-Headers'] = requested_headers
+    return response
 
 # Notification service configuration
 NOTIFICATION_CONFIG = {
     'database_url': os.getenv('DATABASE_URL', 'sqlite:///notifications.db'),
     'websocket_enabled': os.getenv('WEBSOCKET_ENABLED', 'true').lower() == 'true',
     'max_notifications_per_minute': int(os.getenv('MAX_NOTIFICATIONS_PER_MINUTE', 100)),
-    'retention_days': int(os.getenv('NOTIFICATION_RETENTION_DAYS', 30))
+    'retention_days': int(os.getenv('NOTIFICATION_RETENTION_DAYS', 30)),
+    'redis_url': os.getenv('REDIS_URL')
 }
 
+# Required JSON fields per endpoint
+SEND_NOTIFICATION_REQUIRED_FIELDS = frozenset(('user_id', 'title', 'message'))
+
 # Global notification service instance
 notification_service = None
 
+def _coerce_user_id(raw: Any) -> Optional[int]:
+    """Canonical int user_id from JSON or URL input, or None if it isn't one"""
+    if isinstance(raw, int) and not isinstance(raw, bool):
+        return raw
+    if isinstance(raw, str) and raw.isascii() and raw.isdigit():
+        return int(raw)
+    return None
+
+def _notifications_etag(user_id: int, limit: int, offset: int, unread_only: bool, notifications: Any) -> str:
+    """ETag for a page of notifications, from the page data only (not the response timestamp)"""
+    page = app.json.dumps([user_id, limit, offset, unread_only, notifications])
+    return hashlib.blake2b(page.encode(), digest_size=16).hexdigest()
+
 def init_notification_service():
     """Initialize the notification service"""
     global notification_service
@@ -60,7 +111,7 @@ def health_check():
                 'service': 'notification_service',
                 'port': 8002,
                 'health': health,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
@@ -68,7 +119,7 @@ def health_check():
                 'service': 'notification_service',
                 'port': 8002,
                 'error': 'Notification service not initialized',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }), 503
     except Exception as e:
         return jsonify({
@@ -76,7 +127,7 @@ def health_check():
             'service': 'notification_service',
             'port': 8002,
             'error': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/send-notification', methods=['POST'])
@@ -97,18 +148,24 @@ def send_notification():
             }), 400
         
         # Validate required fields
-        required_fields = ['user_id', 'title', 'message']
-        missing_fields = [field for field in required_fields if field not in data]
+        missing_fields = SEND_NOTIFICATION_REQUIRED_FIELDS - data.keys()
         if missing_fields:
             return jsonify({
                 'status': 'error',
-                'message': f'Missing required fields: {", ".join(missing_fields)}'
+                'message': f'Missing required fields: {", ".join(sorted(missing_fields))}'
+            }), 400
+        
+        user_id = _coerce_user_id(data['user_id'])
+        if user_id is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'user_id must be an integer'
             }), 400
         
         # Create notification task
         from .notification_service import NotificationTask
         notification_task = NotificationTask(
-            user_id=data['user_id'],
+            user_id=user_id,
             title=data['title'],
             message=data['message'],
             notification_type=data.get('type', 'info'),
@@ -128,13 +185,13 @@ def send_notification():
                 'status': 'success',
                 'message': 'Notification sent',
                 'notification_id': notification_task.id,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to send notification',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }), 500
             
     except Exception as e:
@@ -142,7 +199,7 @@ def send_notification():
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/notifications/<user_id>', methods=['GET'])
@@ -155,6 +212,13 @@ def get_user_notifications(user_id):
                 'message': 'Notification service not available'
             }), 503
         
+        user_id = _coerce_user_id(user_id)
+        if user_id is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'user_id must be an integer'
+            }), 400
+        
         # Get query parameters
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
@@ -168,21 +232,30 @@ def get_user_notifications(user_id):
             unread_only=unread_only
         )
         
-        return jsonify({
+        # Pollers send back the ETag; an unchanged page answers 304 before any serialization
+        etag = _notifications_etag(user_id, limit, offset, unread_only, notifications)
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        
+        response = jsonify({
             'status': 'success',
             'notifications': notifications,
             'user_id': user_id,
             'limit': limit,
             'offset': offset,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         })
+        response.set_etag(etag, weak=True)
+        return response
         
     except Exception as e:
         logger.error(f"Error getting user notifications: {e}")
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/notifications/<notification_id>/mark-read', methods=['PUT'])
@@ -202,13 +275,13 @@ def mark_notification_read(notification_id):
                 'status': 'success',
                 'message': 'Notification marked as read',
                 'notification_id': notification_id,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to mark notification as read',
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             }), 500
             
     except Exception as e:
@@ -216,7 +289,7 @@ def mark_notification_read(notification_id):
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/metrics', methods=['GET'])
@@ -228,7 +301,7 @@ def get_metrics():
             return jsonify({
                 'status': 'success',
                 'metrics': metrics,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': iso_now()
             })
         else:
             return jsonify({
@@ -239,7 +312,7 @@ def get_metrics():
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 @app.route('/config', methods=['GET'])
@@ -256,16 +329,21 @@ def get_config():
         return jsonify({
             'status': 'success',
             'config': safe_config,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         })
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': iso_now()
         }), 500
 
 if __name__ == '__main__':
+    # Running this module directly serves with waitress (Flask's threaded server if
+    # waitress isn't installed); --dev runs Flask's debug server instead.
+    # Production deployments use gunicorn -c notification_service/gunicorn.conf.py
+    dev_mode = '--dev' in sys.argv
+    
     print("🚀 Starting Notification Service on port 8002...")
     print("=" * 50)
     
@@ -283,13 +361,7 @@ if __name__ == '__main__':
         print("🌐 Access: http://localhost:8002")
         print("=" * 50)
         
-        # Run Flask app
-        app.run(
-            host='0.0.0.0',
-            port=8002,
-            debug=False,
-            threaded=True
-        )
+        run_app(app, 8002, dev=dev_mode)
     else:
         print("❌ Failed to start notification service")
         exit(1)
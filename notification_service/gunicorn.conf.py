@@ -0,0 +1,43 @@
+"""
+Gunicorn settings for the Notification Service API - Port 8002
+Run from the directory containing the Utils_services package, e.g.:
+    gunicorn -c utils_services/notification_service/gunicorn.conf.py utils_services.notification_service.app:app
+"""
+
+import os
+import sys
+
+bind = os.getenv('NOTIFICATION_BIND', '0.0.0.0:8002')
+
+# WebSocket connections, rate limits and the mock notification store live in
+# process memory, so one worker is the safe default; raise GUNICORN_WORKERS
+# only once that state is shared (database/Redis) between processes
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+# gthread by default; GUNICORN_WORKER_CLASS=gevent multiplexes many more idle
+# connections per worker (gunicorn monkey-patches threading/socket itself, so
+# WebSocketManager's locks become cooperative - keep the Flask views sync)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 2000))
+timeout = 60
+graceful_timeout = 30
+
+def on_starting(server):
+    """Print the startup banner once in the master process"""
+    print("🚀 Starting Notification Service on port 8002...")
+    print("=" * 50)
+    print(f"🔧 Gunicorn: {workers} {worker_class} worker(s), bind {bind}")
+    print("📡 API Endpoints:")
+    print("   POST /send-notification")
+    print("   GET  /notifications/<user_id>")
+    print("   PUT  /notifications/<id>/mark-read")
+    print("   GET  /health")
+    print("   GET  /metrics")
+    print("   GET  /config")
+    print("=" * 50)
+
+def post_worker_init(worker):
+    """Start a notification service inside each worker process"""
+    app_module = sys.modules[worker.wsgi.import_name]
+    if not app_module.init_notification_service():
+        worker.log.error("❌ Failed to start notification service in worker %s", worker.pid)
@@ -5,16 +5,60 @@ Handles in-app notifications, WebSocket delivery, and database storage
 
 import json
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, FrozenSet
 import threading
+import time
+import itertools
 import uuid
+from collections import deque
 
-from ..shared.base_service import BaseNotificationService, NotificationTask, DeliveryStatus
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from ..shared.base_service import BaseNotificationService, NotificationTask, DeliveryStatus, iso_now
 from ..shared.queue_manager import QueueManager, QueueTask, QueuePriority
 
 logger = logging.getLogger(__name__)
 
+# Redis rate limiting must never stall a send; a slow or unreachable server times out fast
+_REDIS_SOCKET_TIMEOUT = 0.25
+# After a Redis failure, rate limit in-process for this long before trying Redis again
+_REDIS_RETRY_AFTER = 30.0
+
+# Mock storage IDs; unique for the life of the process
+_notification_ids = itertools.count(1)
+
+# Winner push copy, filled from the winner's draw data
+WINNER_TITLE_TEMPLATE = "🎉 You've Won in {game}!"
+WINNER_BODY_TEMPLATE = (
+    "Your ticket ({ticket_number}) for {game} on {draw_date} matched {match_count} number(s). "
+    "Prize Category: {prize_category}"
+)
+
+# Icon per notification type; unknown types fall back to 'bell'
+_ICON_MAP = {
+    'success': 'check-circle',
+    'info': 'info-circle',
+    'warning': 'exclamation-triangle',
+    'error': 'times-circle',
+    'alert': 'bell',
+    'trophy': 'trophy',
+    'message': 'envelope'
+}
+
+def _encode_message(message: Dict[str, Any]) -> str:
+    """Serialize a socket message once so fanout doesn't re-encode it per socket"""
+    if orjson is not None:
+        return orjson.dumps(message, default=str).decode()
+    return json.dumps(message, default=str)
+
 class PushNotificationTask(NotificationTask):
     """Push notification specific task"""
     
@@ -29,7 +73,8 @@ class PushNotificationTask(NotificationTask):
                  module: str = "general",
                  category: str = "notification",
                  priority: str = "normal",
-                 max_retries: int = 3):
+                 max_retries: int = 3,
+                 timestamp: Optional[str] = None):
         
         super().__init__(
             task_type="push_notification",
@@ -45,7 +90,7 @@ class PushNotificationTask(NotificationTask):
                 'module': module,
                 'category': category,
                 'icon': self._get_icon_for_type(notification_type),
-                'timestamp': datetime.now().isoformat()
+                'timestamp': timestamp or iso_now()
             },
             priority=priority,
             max_retries=max_retries
@@ -54,16 +99,7 @@ class PushNotificationTask(NotificationTask):
     @staticmethod
     def _get_icon_for_type(notification_type: str) -> str:
         """Get appropriate icon for notification type"""
-        icon_map = {
-            'success': 'check-circle',
-            'info': 'info-circle',
-            'warning': 'exclamation-triangle',
-            'error': 'times-circle',
-            'alert': 'bell',
-            'trophy': 'trophy',
-            'message': 'envelope'
-        }
-        return icon_map.get(notification_type, 'bell')
+        return _ICON_MAP.get(notification_type, 'bell')
 
 class DatabaseConnector:
     """Database connector for notification storage"""
@@ -82,8 +118,8 @@ class DatabaseConnector:
         """Store notification in database"""
         try:
             # Mock implementation - in real implementation, this would use Phase1's database
-            notification_id = hash(str(notification_data)) % 1000000
-            self.logger.info(f"Stored notification with ID: {notification_id}")
+            notification_id = next(_notification_ids)
+            self.logger.debug("Stored notification with ID: %s", notification_id)
             return notification_id
         except Exception as e:
             self.logger.error(f"Error storing notification: {e}")
@@ -93,13 +129,14 @@ class DatabaseConnector:
         """Mark notification as delivered"""
         try:
             # Mock implementation
-            self.logger.info(f"Marked notification {notification_id} as delivered")
+            self.logger.debug("Marked notification %s as delivered", notification_id)
             return True
         except Exception as e:
             self.logger.error(f"Error marking notification as delivered: {e}")
             return False
     
-    def get_user_notifications(self, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+    def get_user_notifications(self, user_id: int, limit: int = 50, offset: int = 0,
+                               unread_only: bool = False) -> List[Dict[str, Any]]:
         """Get user notifications from database"""
         try:
             # Mock implementation
@@ -111,51 +148,81 @@ class DatabaseConnector:
 class WebSocketManager:
     """WebSocket manager for real-time notifications"""
     
+    SHARD_COUNT = 16
+    
     def __init__(self):
-        self.active_connections: Dict[int, List[str]] = {}  # user_id -> [socket_ids]
+        # Connections are split into shards by user_id, each with its own writer lock.
+        # A shard maps user_id -> frozenset(socket_ids) and is replaced wholesale on
+        # every change, so readers use whatever snapshot they pick up without locking
+        self.shards: List[Dict[int, FrozenSet[str]]] = [{} for _ in range(self.SHARD_COUNT)]
+        self.shard_locks = [threading.Lock() for _ in range(self.SHARD_COUNT)]
         self.socket_users: Dict[str, int] = {}  # socket_id -> user_id
-        self.lock = threading.Lock()
+        self.lock = threading.Lock()  # guards socket_users
         self.logger = logging.getLogger(f"{__name__}.WebSocketManager")
     
+    def _shard_index(self, user_id: int) -> int:
+        """Shard holding a user's connections"""
+        return hash(user_id) % self.SHARD_COUNT
+    
     def add_connection(self, user_id: int, socket_id: str):
         """Add user socket connection"""
+        index = self._shard_index(user_id)
+        with self.shard_locks[index]:
+            connections = dict(self.shards[index])
+            connections[user_id] = connections.get(user_id, frozenset()) | {socket_id}
+            self.shards[index] = connections
         with self.lock:
-            if user_id not in self.active_connections:
-                self.active_connections[user_id] = []
-            self.active_connections[user_id].append(socket_id)
             self.socket_users[socket_id] = user_id
-        self.logger.debug(f"Added connection for user {user_id}: {socket_id}")
+        self.logger.debug("Added connection for user %s: %s", user_id, socket_id)
     
     def remove_connection(self, socket_id: str):
         """Remove socket connection"""
         with self.lock:
-            if socket_id in self.socket_users:
-                user_id = self.socket_users[socket_id]
-                if user_id in self.active_connections:
-                    if socket_id in self.active_connections[user_id]:
-                        self.active_connections[user_id].remove(socket_id)
-                    if not self.active_connections[user_id]:
-                        del self.active_connections[user_id]
-                del self.socket_users[socket_id]
-        self.logger.debug(f"Removed connection: {socket_id}")
-    
-    def get_user_sockets(self, user_id: int) -> List[str]:
+            user_id = self.socket_users.pop(socket_id, None)
+        if user_id is None:
+            return
+        
+        index = self._shard_index(user_id)
+        with self.shard_locks[index]:
+            socket_ids = self.shards[index].get(user_id)
+            if socket_ids:
+                connections = dict(self.shards[index])
+                remaining = socket_ids - {socket_id}
+                if remaining:
+                    connections[user_id] = remaining
+                else:
+                    del connections[user_id]
+                self.shards[index] = connections
+        self.logger.debug("Removed connection: %s", socket_id)
+    
+    def get_user_sockets(self, user_id: int) -> Tuple[str, ...]:
         """Get all socket connections for a user"""
-        with self.lock:
-            return self.active_connections.get(user_id, []).copy()
+        return tuple(self.shards[self._shard_index(user_id)].get(user_id, ()))
+    
+    def connection_count(self) -> int:
+        """Number of open sockets"""
+        return len(self.socket_users)
+    
+    def user_count(self) -> int:
+        """Number of users with at least one open socket"""
+        return sum(len(shard) for shard in self.shards)
     
     def send_to_user(self, user_id: int, message: Dict[str, Any]) -> bool:
         """Send message to all user's connected sockets"""
-        socket_ids = self.get_user_sockets(user_id)
+        socket_ids = self.shards[self._shard_index(user_id)].get(user_id)
         if not socket_ids:
-            self.logger.debug(f"No active connections for user {user_id}")
+            self.logger.debug("No active connections for user %s", user_id)
             return False
         
+        return self._send_to_sockets(socket_ids, _encode_message(message))
+    
+    def _send_to_sockets(self, socket_ids, payload: str) -> bool:
+        """Send one encoded message to a set of sockets"""
         sent_count = 0
         for socket_id in socket_ids:
             try:
                 # Mock implementation - in real implementation, this would use SocketIO
-                self.logger.debug(f"Sending notification to socket {socket_id}: {message}")
+                self.logger.debug("Sending notification to socket %s: %s", socket_id, payload)
                 sent_count += 1
             except Exception as e:
                 self.logger.error(f"Error sending to socket {socket_id}: {e}")
@@ -164,10 +231,12 @@ class WebSocketManager:
     
     def broadcast_to_all(self, message: Dict[str, Any]) -> int:
         """Broadcast message to all connected users"""
+        # Shard snapshots already hold every user's sockets; no per-user lookup needed
+        payload = _encode_message(message)
         sent_count = 0
-        with self.lock:
-            for user_id in self.active_connections.keys():
-                if self.send_to_user(user_id, message):
+        for shard in self.shards:
+            for socket_ids in shard.values():
+                if self._send_to_sockets(socket_ids, payload):
                     sent_count += 1
         return sent_count
 
@@ -193,9 +262,24 @@ class NotificationService(BaseNotificationService):
         self.send_via_websocket = config.get('send_via_websocket', True)
         self.max_notifications_per_user_per_hour = config.get('max_notifications_per_user_per_hour', 100)
         
-        # Rate limiting
-        self.user_notification_counts = {}  # user_id -> [timestamps]
+        # Rate limiting; shared across processes through Redis when redis_url is set
+        self.user_notification_counts = {}  # user_id -> deque of recent send timestamps
         self.rate_limit_lock = threading.Lock()
+        self.redis_client = self._create_redis_client(config.get('redis_url'))
+        self._redis_down_until = 0.0  # monotonic time; 0 while Redis is healthy
+    
+    def _create_redis_client(self, redis_url: Optional[str]):
+        """Create the Redis client used for rate limiting, if configured"""
+        if not redis_url:
+            return None
+        if redis is None:
+            self.logger.warning("redis_url is set but the redis package is not installed, rate limiting in-process")
+            return None
+        return redis.Redis.from_url(
+            redis_url,
+            socket_connect_timeout=_REDIS_SOCKET_TIMEOUT,
+            socket_timeout=_REDIS_SOCKET_TIMEOUT
+        )
     
     def initialize(self) -> bool:
         """Initialize the notification service"""
@@ -224,7 +308,7 @@ class NotificationService(BaseNotificationService):
             # Rate limiting check
             user_id = int(task.recipient)
             if not self._check_rate_limit(user_id):
-                self.logger.warning(f"Rate limit exceeded for user {user_id}")
+                self.logger.warning("Rate limit exceeded for user %s", user_id)
                 return False
             
             # Convert to queue task
@@ -253,23 +337,54 @@ class NotificationService(BaseNotificationService):
     
     def _check_rate_limit(self, user_id: int) -> bool:
         """Check if user is within rate limits"""
+        if self.redis_client is not None and time.monotonic() >= self._redis_down_until:
+            try:
+                allowed = self._check_rate_limit_redis(user_id)
+                if self._redis_down_until:
+                    self._redis_down_until = 0.0
+                    self.logger.info("Redis rate limiting restored")
+                return allowed
+            except Exception as e:
+                # Log only the healthy -> down transition, not every failed retry
+                if not self._redis_down_until:
+                    self.logger.warning("Redis rate limit check failed, rate limiting in-process for %ss: %s",
+                                        _REDIS_RETRY_AFTER, e)
+                self._redis_down_until = time.monotonic() + _REDIS_RETRY_AFTER
+        
         with self.rate_limit_lock:
-            now = datetime.now()
-            if user_id not in self.user_notification_counts:
-                self.user_notification_counts[user_id] = []
-            
-            # Remove timestamps older than 1 hour
-            hour_ago = now.timestamp() - 3600
-            self.user_notification_counts[user_id] = [
-                ts for ts in self.user_notification_counts[user_id] if ts > hour_ago
-            ]
+            now = time.time()
+            timestamps = self.user_notification_counts.get(user_id)
+            if timestamps is None:
+                timestamps = deque(maxlen=self.max_notifications_per_user_per_hour)
+                self.user_notification_counts[user_id] = timestamps
             
-            if len(self.user_notification_counts[user_id]) >= self.max_notifications_per_user_per_hour:
+            # Ring buffer of the last N sends: once full, the user is over the limit
+            # only if the oldest of them is still inside the hour; append evicts it
+            if len(timestamps) == timestamps.maxlen and (not timestamps or timestamps[0] > now - 3600):
                 return False
             
-            self.user_notification_counts[user_id].append(now.timestamp())
+            timestamps.append(now)
             return True
     
+    def _check_rate_limit_redis(self, user_id: int) -> bool:
+        """Sliding one-hour window kept in a Redis sorted set, shared by all workers"""
+        key = f"notification_rate:{user_id}"
+        now = time.time()
+        member = uuid.uuid4().hex
+        
+        pipe = self.redis_client.pipeline()
+        pipe.zremrangebyscore(key, 0, now - 3600)
+        pipe.zcard(key)
+        pipe.zadd(key, {member: now})
+        pipe.expire(key, 3600)
+        _, count, _, _ = pipe.execute()
+        
+        if count >= self.max_notifications_per_user_per_hour:
+            # Rejected sends don't count against the window
+            self.redis_client.zrem(key, member)
+            return False
+        return True
+    
     def _process_notification_task(self, queue_task: QueueTask) -> bool:
         """Process notification task from queue"""
         try:
@@ -298,7 +413,7 @@ class NotificationService(BaseNotificationService):
             self.update_metrics(success)
             
             if success:
-                self.logger.info(f"Notification sent to user {user_id}")
+                self.logger.debug("Notification sent to user %s", user_id)
             
             return success
             
@@ -307,30 +422,32 @@ class NotificationService(BaseNotificationService):
             self.update_metrics(False, str(e))
             return False
     
-    def send_winner_notification(self, winner_data: Dict[str, Any]) -> bool:
-        """Send winner notification"""
+    def send_winner_notification(self, winner_data: Dict[str, Any], timestamp: Optional[str] = None) -> bool:
+        """Send winner notification; pass one timestamp to stamp a whole draw's winners alike"""
         try:
             # Extract winner information
-            user_id = winner_data.get('user_id')
-            game = winner_data.get('game', 'Lottery')
-            ticket_number = winner_data.get('ticket_number', 'N/A')
-            draw_date = winner_data.get('draw_date', 'Unknown')
-            match_count = winner_data.get('classic_draw', {}).get('match', 0)
-            prize_category = winner_data.get('classic_draw', {}).get('prize_category', 'Win')
-            ticket_id = winner_data.get('ticket_id', 0)
+            classic_draw = winner_data.get('classic_draw', {})
+            fields = {
+                'game': winner_data.get('game', 'Lottery'),
+                'ticket_number': winner_data.get('ticket_number', 'N/A'),
+                'draw_date': winner_data.get('draw_date', 'Unknown'),
+                'match_count': classic_draw.get('match', 0),
+                'prize_category': classic_draw.get('prize_category', 'Win')
+            }
             
             # Create notification task
             notification_task = PushNotificationTask(
-                user_id=user_id,
-                title=f"🎉 You've Won in {game}!",
-                body=f"Your ticket ({ticket_number}) for {game} on {draw_date} matched {match_count} number(s). Prize Category: {prize_category}",
+                user_id=winner_data.get('user_id'),
+                title=WINNER_TITLE_TEMPLATE.format_map(fields),
+                body=WINNER_BODY_TEMPLATE.format_map(fields),
                 notification_type="success",
-                action_url=f"/tickets/{ticket_id}",
+                action_url=f"/tickets/{winner_data.get('ticket_id', 0)}",
                 action_text="View Ticket",
                 platform="phase1",
                 module="tickets",
                 category="winner",
-                priority="high"
+                priority="high",
+                timestamp=timestamp
             )
             
             return self.send_notification(notification_task)
@@ -347,9 +464,10 @@ class NotificationService(BaseNotificationService):
         """Remove WebSocket connection"""
         self.websocket_manager.remove_connection(socket_id)
     
-    def get_user_notifications(self, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+    def get_user_notifications(self, user_id: int, limit: int = 50, offset: int = 0,
+                               unread_only: bool = False) -> List[Dict[str, Any]]:
         """Get user notifications"""
-        return self.db_connector.get_user_notifications(user_id, limit)
+        return self.db_connector.get_user_notifications(user_id, limit, offset, unread_only)
     
     def health_check(self) -> Dict[str, Any]:
         """Check notification service health"""
@@ -359,8 +477,8 @@ class NotificationService(BaseNotificationService):
             
             # Get WebSocket stats
             websocket_stats = {
-                'active_connections': len(self.websocket_manager.socket_users),
-                'active_users': len(self.websocket_manager.active_connections)
+                'active_connections': self.websocket_manager.connection_count(),
+                'active_users': self.websocket_manager.user_count()
             }
             
             return {
@@ -370,6 +488,7 @@ class NotificationService(BaseNotificationService):
                 'metrics': self.get_metrics(),
                 'rate_limiting': {
                     'max_per_hour': self.max_notifications_per_user_per_hour,
+                    'backend': 'redis' if self.redis_client is not None and not self._redis_down_until else 'memory',
                     'active_rate_limits': len(self.user_notification_counts)
                 }
             }
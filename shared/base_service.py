@@ -4,7 +4,9 @@ Provides common functionality for all notification services
 """
 
 import logging
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -12,6 +14,20 @@ from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# (millisecond, formatted timestamp) of the last iso_now() call
+_iso_cache = (0, '')
+
+def iso_now() -> str:
+    """Current local time in ISO format, reformatted at most once per millisecond"""
+    global _iso_cache
+    now_ns = time.time_ns()
+    now_ms = now_ns // 1_000_000
+    cached_ms, cached_iso = _iso_cache
+    if now_ms != cached_ms:
+        cached_iso = datetime.fromtimestamp(now_ns / 1e9).isoformat()
+        _iso_cache = (now_ms, cached_iso)
+    return cached_iso
+
 class ServiceStatus(Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
@@ -42,8 +58,7 @@ class NotificationTask:
         self.max_retries = max_retries
         self.retry_count = 0
         self.status = DeliveryStatus.PENDING
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        self.created_at = self.updated_at = datetime.now()
         self.error_message = None
         
     def to_dict(self) -> Dict[str, Any]:
@@ -199,11 +214,19 @@ class ServiceRegistry:
         return results
     
     def health_check_all(self) -> Dict[str, Dict[str, Any]]:
-        """Run health check on all services"""
+        """Run health check on all services concurrently"""
+        services = list(self.services.items())
+        if not services:
+            return {}
+        
+        # Probes block on network I/O (SMTP, sockets), so run them side by side
+        with ThreadPoolExecutor(max_workers=len(services)) as pool:
+            futures = {name: pool.submit(service.health_check) for name, service in services}
+        
         health_status = {}
-        for name, service in self.services.items():
+        for name, future in futures.items():
             try:
-                health_status[name] = service.health_check()
+                health_status[name] = future.result()
             except Exception as e:
                 health_status[name] = {
                     'status': 'error',
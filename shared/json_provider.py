@@ -0,0 +1,38 @@
+"""
+orjson-backed JSON provider for the Utils_services Flask APIs
+Falls back to Flask's default provider when orjson is not installed
+"""
+
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize obj, leaving datetimes to Flask's default() so output matches jsonify"""
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        """Deserialize JSON text or bytes"""
+        return orjson.loads(s)
+
+def install_json_provider(app) -> bool:
+    """Use orjson for the app's jsonify/get_json when available"""
+    if orjson is None:
+        logger.debug("orjson not installed, using Flask's default JSON provider")
+        return False
+
+    app.json = OrJSONProvider(app)
+    return True
@@ -4,7 +4,8 @@ Handles queuing, processing, and retry logic for all notification services
 """
 
 import json
-import time
+import heapq
+import itertools
 import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Callable
@@ -35,8 +36,7 @@ class QueueTask:
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.retry_count = 0
-        self.created_at = datetime.now()
-        self.scheduled_at = datetime.now()
+        self.created_at = self.scheduled_at = datetime.now()
         self.last_attempt_at = None
         self.error_message = None
         self.status = "pending"
@@ -44,7 +44,7 @@ class QueueTask:
 class InMemoryQueue:
     """In-memory queue implementation with priority support"""
     
-    def __init__(self, name: str):
+    def __init__(self, name: str, max_failed: int = 1000):
         self.name = name
         self.queues = {
             QueuePriority.URGENT: deque(),
@@ -52,8 +52,11 @@ class InMemoryQueue:
             QueuePriority.NORMAL: deque(),
             QueuePriority.LOW: deque()
         }
-        self.failed_queue = deque()
-        self.retry_queue = deque()
+        # Keep only the most recent permanent failures; total_failed counts all
+        self.failed_queue = deque(maxlen=max_failed)
+        # Min-heap of (scheduled_at, seq, task) so the next due retry is at index 0
+        self.retry_queue = []
+        self._retry_seq = itertools.count()
         self.lock = threading.Lock()
         self.metrics = {
             'total_added': 0,
@@ -68,7 +71,7 @@ class InMemoryQueue:
             with self.lock:
                 self.queues[task.priority].append(task)
                 self.metrics['total_added'] += 1
-            logger.debug(f"Added task {task.task_id} to {self.name} queue")
+            logger.debug("Added task %s to %s queue", task.task_id, self.name)
             return True
         except Exception as e:
             logger.error(f"Error adding task to queue {self.name}: {e}")
@@ -78,11 +81,8 @@ class InMemoryQueue:
         """Get next task with highest priority"""
         with self.lock:
             # Check retry queue first
-            if self.retry_queue:
-                for i, task in enumerate(list(self.retry_queue)):
-                    if datetime.now() >= task.scheduled_at:
-                        self.retry_queue.remove(task)
-                        return task
+            if self.retry_queue and datetime.now() >= self.retry_queue[0][0]:
+                return heapq.heappop(self.retry_queue)[2]
             
             # Check priority queues
             for priority in [QueuePriority.URGENT, QueuePriority.HIGH, 
@@ -96,22 +96,23 @@ class InMemoryQueue:
         """Mark task as successfully processed"""
         with self.lock:
             self.metrics['total_processed'] += 1
-        logger.debug(f"Task {task.task_id} processed successfully")
+        logger.debug("Task %s processed successfully", task.task_id)
     
     def mark_failed(self, task: QueueTask, error_message: str):
         """Mark task as failed and handle retry logic"""
+        now = datetime.now()
         task.error_message = error_message
-        task.last_attempt_at = datetime.now()
+        task.last_attempt_at = now
         task.retry_count += 1
         
         with self.lock:
             if task.retry_count < task.max_retries:
                 # Schedule for retry
-                task.scheduled_at = datetime.now() + timedelta(seconds=task.retry_delay * task.retry_count)
+                task.scheduled_at = now + timedelta(seconds=task.retry_delay * task.retry_count)
                 task.status = "retrying"
-                self.retry_queue.append(task)
+                heapq.heappush(self.retry_queue, (task.scheduled_at, next(self._retry_seq), task))
                 self.metrics['total_retried'] += 1
-                logger.info(f"Task {task.task_id} scheduled for retry {task.retry_count}/{task.max_retries}")
+                logger.info("Task %s scheduled for retry %s/%s", task.task_id, task.retry_count, task.max_retries)
             else:
                 # Move to failed queue
                 task.status = "failed"
@@ -150,6 +151,8 @@ class QueueProcessor:
         self.max_workers = max_workers
         self.poll_interval = poll_interval
         self.running = False
+        # Set on stop so idle workers wake immediately instead of finishing their poll sleep
+        self._stop_event = threading.Event()
         self.workers = []
         self.logger = logging.getLogger(f"{__name__}.{name}")
     
@@ -159,6 +162,7 @@ class QueueProcessor:
             return
         
         self.running = True
+        self._stop_event.clear()
         self.logger.info(f"Starting queue processor {self.name} with {self.max_workers} workers")
         
         for i in range(self.max_workers):
@@ -170,6 +174,7 @@ class QueueProcessor:
     def stop(self):
         """Stop queue processing"""
         self.running = False
+        self._stop_event.set()
         self.logger.info(f"Stopping queue processor {self.name}")
         
         # Wait for workers to finish
@@ -181,14 +186,14 @@ class QueueProcessor:
         """Worker loop that processes queue tasks"""
         self.logger.debug(f"Worker {worker_id} started for {self.name}")
         
-        while self.running:
+        while not self._stop_event.is_set():
             try:
                 task = self.queue.get_next()
                 if task is None:
-                    time.sleep(self.poll_interval)
+                    self._stop_event.wait(self.poll_interval)
                     continue
                 
-                self.logger.debug(f"Worker {worker_id} processing task {task.task_id}")
+                self.logger.debug("Worker %s processing task %s", worker_id, task.task_id)
                 
                 # Process the task
                 try:
@@ -202,7 +207,7 @@ class QueueProcessor:
                     
             except Exception as e:
                 self.logger.error(f"Worker {worker_id} error: {e}")
-                time.sleep(self.poll_interval)
+                self._stop_event.wait(self.poll_interval)
         
         self.logger.debug(f"Worker {worker_id} stopped for {self.name}")
 
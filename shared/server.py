@@ -0,0 +1,36 @@
+"""
+Launcher for running a Utils_services Flask API directly as a script
+Serves with waitress when installed, otherwise Flask's threaded server
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+def run_app(app, port: int, dev: bool = False):
+    """Serve app on port; dev forces Flask's debug server"""
+    if not dev:
+        try:
+            from waitress import serve
+        except ImportError:
+            serve = None
+
+        if serve:
+            logger.info(f"Serving {app.name} with waitress on port {port}")
+            serve(
+                app,
+                host='0.0.0.0',
+                port=port,
+                threads=int(os.getenv('WAITRESS_THREADS', 8)),
+                channel_timeout=int(os.getenv('WAITRESS_CHANNEL_TIMEOUT', 30))
+            )
+            return
+
+    app.run(
+        host='0.0.0.0',
+        port=port,
+        debug=dev,
+        use_reloader=False,
+        threaded=True
+    )
@@ -10,6 +10,9 @@ import time
 
 EMAIL_SERVICE_URL = "http://localhost:7001"
 
+# One keep-alive session for every call against the service
+session = requests.Session()
+
 def test_email_service():
     """Test the email service functionality"""
     print("🧪 Testing Email Service API")
@@ -18,7 +21,7 @@ def test_email_service():
     # Test 1: Health check
     print("1. 💚 Testing health check...")
     try:
-        response = requests.get(f"{EMAIL_SERVICE_URL}/health")
+        response = session.get(f"{EMAIL_SERVICE_URL}/health")
         if response.status_code == 200:
             print("   ✅ Health check passed")
             print(f"   📊 Status: {response.json()['health']['status']}")
@@ -32,7 +35,7 @@ def test_email_service():
     # Test 2: Get configuration
     print("\n2. ⚙️ Getting service configuration...")
     try:
-        response = requests.get(f"{EMAIL_SERVICE_URL}/config")
+        response = session.get(f"{EMAIL_SERVICE_URL}/config")
         if response.status_code == 200:
             config = response.json()['config']
             print("   ✅ Configuration retrieved")
@@ -46,7 +49,7 @@ def test_email_service():
     # Test 3: List templates
     print("\n3. 📋 Getting available templates...")
     try:
-        response = requests.get(f"{EMAIL_SERVICE_URL}/templates")
+        response = session.get(f"{EMAIL_SERVICE_URL}/templates")
         if response.status_code == 200:
             templates = response.json()['templates']
             print("   ✅ Templates retrieved")
@@ -66,7 +69,7 @@ def test_email_service():
     }
     
     try:
-        response = requests.post(
+        response = session.post(
             f"{EMAIL_SERVICE_URL}/send-email",
             headers={"Content-Type": "application/json"},
             json=email_data
@@ -95,7 +98,7 @@ def test_email_service():
     }
     
     try:
-        response = requests.post(
+        response = session.post(
             f"{EMAIL_SERVICE_URL}/send-winner-notification",
             headers={"Content-Type": "application/json"},
             json=winner_data
@@ -111,7 +114,7 @@ def test_email_service():
     # Test 6: Get metrics
     print("\n6. 📊 Getting service metrics...")
     try:
-        response = requests.get(f"{EMAIL_SERVICE_URL}/metrics")
+        response = session.get(f"{EMAIL_SERVICE_URL}/metrics")
         if response.status_code == 200:
             metrics = response.json()['metrics']
             print("   ✅ Metrics retrieved")